@@ -1,40 +1,54 @@
 # -*- coding: utf-8 -*-
 """
 生成每个用户的 RSS：
-- 频道含 lastBuildDate / ttl(5)
+- 频道含 lastBuildDate / ttl(5)；默认用 rss_builder.build_feed 模板拼 XML，SRSS_FEEDGEN=1 回退 feedgen
 - 每次生成追加“实时快照”item（guid 含分钟时间戳）
 - 条目：价格 + 涨跌幅 + 资金流 + 成交额
 - 资金流单位：统一“万元·整数”，正=流入，负=流出
 """
 from __future__ import annotations
 
+import json
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 import yaml
 from feedgen.feed import FeedGenerator
 
 from data_providers import (
+    CACHE_DIR,
+    FundFlow,
+    Quote,
     normalize_code,
     get_northbound_overview,
     get_realtime_quotes,
     get_fund_flow_batch,
 )
+from rss_builder import build_feed
 
 ROOT = Path(__file__).resolve().parents[1]
 USERS_DIR = ROOT / "configs" / "users"
 OUTPUT_DIR = Path(os.environ.get("OUTPUT_DIR", "/var/www/stockrss/feeds"))
 SITE_LINK = "https://stockrss.cuixiaoyuan.cn"
+MAX_WORKERS = max(1, int(os.environ.get("SRSS_WORKERS", "8")))
+FEED_DESCRIPTION = "北向资金 / 主力-大中小单净流入 / 实时涨跌 订阅"
+USE_FEEDGEN = os.environ.get("SRSS_FEEDGEN") == "1"  # 回退到 feedgen 生成（对比输出用）
+
+# YAML 解析缓存：路径 -> [mtime_ns, 解析后的 user]；含 token，放私有缓存目录而不是 OUTPUT_DIR
+USERS_CACHE = CACHE_DIR / "users.json"
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # 有 libyaml 时用 C 实现
 
 TOKEN_RE = re.compile(r"^[A-Za-z0-9]{6,32}$")
 
 def load_user_yaml(p: Path) -> dict:
-    data = yaml.safe_load(p.read_text(encoding="utf-8"))
+    data = yaml.load(p.read_text(encoding="utf-8"), Loader=YAML_LOADER)
     if not isinstance(data, dict):
         raise ValueError("YAML 不是字典")
     user_id = str(data.get("user_id", "")).strip()
@@ -46,9 +60,31 @@ def load_user_yaml(p: Path) -> dict:
     norm_stocks = [normalize_code(s) for s in stocks]
     return {"user_id": user_id, "token": token, "title": title, "stocks": norm_stocks}
 
+def load_users_cache() -> dict:
+    try:
+        data = json.loads(USERS_CACHE.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def save_users_cache(cache: dict) -> None:
+    try:
+        USERS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = USERS_CACHE.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, USERS_CACHE)
+    except Exception as e:
+        print(f"[WARN] 写入用户缓存失败 -> {e}")
+
 def ensure_output_dir():
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+@lru_cache(maxsize=4096)
+def _fmt_yi_from_wan(fv: float) -> str:
+    yi = fv / 1e4
+    return f"{yi:.2f} 亿" if abs(yi) >= 1 else f"{fv:.0f} 万"
+
 def to_yi_from_wan(v) -> str:
     """把“万元”格式成“xx.xx 亿 / yyy 万”（用于成交额的友好展示）"""
     if v is None:
@@ -57,8 +93,11 @@ def to_yi_from_wan(v) -> str:
         fv = float(v)
     except Exception:
         return "—"
-    yi = fv / 1e4
-    return f"{yi:.2f} 亿" if abs(yi) >= 1 else f"{fv:.0f} 万"
+    return _fmt_yi_from_wan(fv)
+
+@lru_cache(maxsize=4096)
+def _fmt_wan_int(iv: int) -> str:
+    return f"{iv:,} 万"
 
 def fmt_wan_int(v) -> str:
     """万元整数，保留正负号，带千分位"""
@@ -71,7 +110,9 @@ def fmt_wan_int(v) -> str:
             iv = int(round(float(v)))
         except Exception:
             return "—"
-    return f"{iv:,} 万"
+    return _fmt_wan_int(iv)
+
+_DIR_ARROWS = {1: "↑流入", -1: "↓流出"}
 
 def dir_arrow(v) -> str:
     """方向：↑流入 / ↓流出 / —"""
@@ -81,27 +122,61 @@ def dir_arrow(v) -> str:
         fv = float(v)
     except Exception:
         return "—"
-    return "↑流入" if fv > 0 else ("↓流出" if fv < 0 else "—")
-
-def build_feed_for_user(user: dict) -> Path:
-    user_id, token, title, stocks = user["user_id"], user["token"], user["title"], user["stocks"]
-    tz = ZoneInfo("Asia/Shanghai")
-    now = datetime.now(tz)
+    return _DIR_ARROWS.get((fv > 0) - (fv < 0), "—")
 
+def write_rss_feedgen(out: Path, channel: dict, items: List[dict], now: datetime) -> None:
+    """旧的 feedgen 生成路径（SRSS_FEEDGEN=1 时启用，便于对比输出）。"""
     fg = FeedGenerator()
-    fg.title(title)
-    fg.link(href=SITE_LINK, rel="alternate")
-    fg.description("北向资金 / 主力-大中小单净流入 / 实时涨跌 订阅")
-    fg.language("zh-cn")
+    fg.title(channel["title"])
+    fg.link(href=channel["link"], rel="alternate")
+    fg.description(channel["description"])
+    fg.language(channel["language"])
     try:
         fg.lastBuildDate(now)
-        fg.ttl(5)
+        fg.ttl(channel["ttl"])
     except Exception:
         pass
 
-    overview = get_northbound_overview()
-    quotes = get_realtime_quotes(stocks) if stocks else {}
-    flows  = get_fund_flow_batch(stocks) if stocks else {}
+    add_entry = fg.add_entry
+    for it in items:
+        item = add_entry()
+        item.id(it["guid"])
+        item.title(it["title"])
+        if it.get("link"):
+            item.link(href=it["link"])
+        try:
+            item.description(it["description"])
+        except Exception:
+            item.content(it["description"], type="CDATA")
+        item.published(now)
+        item.updated(now)
+
+    fg.rss_file(str(out), pretty=True)
+
+def build_feed_for_user(
+    user: dict,
+    quotes_all: Dict[str, Quote],
+    flows_all: Dict[str, FundFlow],
+    overview: Dict[str, Optional[float]],
+) -> Path:
+    """行情/资金流/北向由 main() 对所有用户统一抓取一次，这里只挑出本用户的股票。"""
+    user_id, token, title, stocks = user["user_id"], user["token"], user["title"], user["stocks"]
+    tz = ZoneInfo("Asia/Shanghai")
+    now = datetime.now(tz)
+
+    channel = {
+        "title": title,
+        "link": SITE_LINK,
+        "description": FEED_DESCRIPTION,
+        "language": "zh-cn",
+        "build_date": now,
+        "ttl": 5,
+    }
+    items: List[dict] = []
+    date_ymd = now.strftime("%Y%m%d")  # 循环不变量，提到循环外
+
+    quotes = {c: quotes_all[c] for c in stocks if c in quotes_all}
+    flows  = {c: flows_all[c] for c in stocks if c in flows_all}
 
     for c in stocks:
         q = quotes.get(c)
@@ -115,11 +190,6 @@ def build_feed_for_user(user: dict) -> Path:
         else:
             title_item = f"{name}（行情暂不可用）"
 
-        item = fg.add_entry()
-        item.id(f"{user_id}-{c}-{now.strftime('%Y%m%d')}")
-        item.title(title_item)
-        item.link(href=SITE_LINK)
-
         if f:
             desc = (
                 f"<p>资金流（万元）："
@@ -136,62 +206,92 @@ def build_feed_for_user(user: dict) -> Path:
         if q and q.amount_wan is not None:
             desc += f"<p>成交额：{to_yi_from_wan(q.amount_wan)}</p>"
 
-        try:
-            item.description(desc)
-        except Exception:
-            item.content(desc, type="CDATA")
-
-        item.published(now)
-        item.updated(now)
+        items.append({
+            "guid": f"{user_id}-{c}-{date_ymd}",
+            "title": title_item,
+            "link": SITE_LINK,
+            "description": desc,
+            "pubdate": now,
+        })
 
     # 快照 item（保证阅读器每次识别有更新）
-    snap = fg.add_entry()
-    snap.id(f"{user_id}-snapshot-{now.strftime('%Y%m%d%H%M')}")
-    snap.title(f"{title} 实时快照 @ {now.strftime('%Y-%m-%d %H:%M')}")
+    now_min, now_sec = now.strftime("%Y-%m-%d %H:%M"), now.strftime("%Y-%m-%d %H:%M:%S")
     def nb_text(ov):
         if not ov or ov.get("total") is None:
             return "北向资金：接口暂不可用 / 闭市"
         return f"北向资金（亿元）｜沪股通 {ov['sh']}｜深股通 {ov['sz']}｜合计 {ov['total']}｜时间 {ov['time']}"
     snap_html = f"""
 <ul>
-  <li>更新时间：{now.strftime('%Y-%m-%d %H:%M:%S')}</li>
+  <li>更新时间：{now_sec}</li>
   <li>{nb_text(overview)}</li>
   <li>覆盖股票数：{len(stocks)}</li>
 </ul>
 """.strip()
-    try:
-        snap.description(snap_html)
-    except Exception:
-        snap.content(snap_html, type="CDATA")
-    snap.published(now)
-    snap.updated(now)
+    items.append({
+        "guid": f"{user_id}-snapshot-{now.strftime('%Y%m%d%H%M')}",
+        "title": f"{title} 实时快照 @ {now_min}",
+        "description": snap_html,
+        "pubdate": now,
+    })
 
+    # 先写临时文件再 os.replace 原子替换，避免阅读器抓到写了一半的 XML
     out = OUTPUT_DIR / f"{user_id}-{token}.xml"
-    fg.rss_file(out, pretty=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    if USE_FEEDGEN:
+        write_rss_feedgen(tmp, channel, items, now)
+    else:
+        tmp.write_bytes(build_feed(channel, items))
+    os.replace(tmp, out)
     return out
 
 def main():
     ensure_output_dir()
     users = []
+    cache = load_users_cache()
+    fresh = {}  # 只保留本次仍存在的文件，已删除的 YAML 自然失效
     for p in sorted(USERS_DIR.glob("*.yaml")):
+        key, mtime = str(p), p.stat().st_mtime_ns
+        hit = cache.get(key)
+        if hit and hit[0] == mtime:
+            users.append(hit[1])
+            fresh[key] = hit
+            continue
         with p.open("rb") as f:
             if f.read(1) == b"<":
                 print(f"[SKIP] {p.name} -> 似乎是 HTML，跳过")
                 continue
         try:
-            users.append(load_user_yaml(p))
+            u = load_user_yaml(p)
         except Exception as e:
             print(f"[SKIP] {p.name} -> {e}")
             continue
+        users.append(u)
+        fresh[key] = [mtime, u]
+    if fresh != cache:
+        save_users_cache(fresh)
+
+    # 所有用户的股票取并集，行情/资金流/北向各只抓一次；三者互不依赖，并发抓取
+    all_stocks = sorted({c for u in users for c in u["stocks"]})
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        f_quotes = ex.submit(get_realtime_quotes, all_stocks)
+        f_flows = ex.submit(get_fund_flow_batch, all_stocks)
+        f_overview = ex.submit(get_northbound_overview)
+        quotes_all, flows_all, overview = f_quotes.result(), f_flows.result(), f_overview.result()
 
     generated: List[str] = []
-    for u in users:
-        try:
-            out = build_feed_for_user(u)
-            print(f"[OK] {u['user_id']} → {out}")
-            generated.append(out.name)
-        except Exception as e:
-            print(f"[ERR] {u['user_id']} -> {e}")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {
+            ex.submit(build_feed_for_user, u, quotes_all, flows_all, overview): u
+            for u in users
+        }
+        for fut in as_completed(futures):
+            u = futures[fut]
+            try:
+                out = fut.result()
+                print(f"[OK] {u['user_id']} → {out}")
+                generated.append(out.name)
+            except Exception as e:
+                print(f"[ERR] {u['user_id']} -> {e}")
     print(f"[DONE] generated feeds: {generated}")
 
 if __name__ == "__main__":
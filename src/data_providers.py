@@ -2,27 +2,145 @@
 """
 data_providers.py  (TuShare + Eastmoney)
 - 北向资金：TuShare pro.moneyflow_hsgt（单位：亿元）
-- A股报价/涨跌幅/成交额（万元）：TuShare pro_bar(freq="1min") + daily（补前收）
+- A股报价/涨跌幅/成交额（万元）：TuShare stk_mins(freq="1min"，逐只并发) + daily（补前收，多代码批量）
 - 个股资金流：东方财富 push2（单位元 -> 万元·整数；正=流入，负=流出），保留实时性
 """
 from __future__ import annotations
 
+import atexit
+import json
+import math
 import os
-import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+try:
+    import fcntl  # POSIX 文件锁；Windows 下无，则不加锁
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+try:
+    import orjson  # 可选：解析东财 JSON 更快；未安装则用 requests 自带的 json
+except ImportError:  # pragma: no cover
+    orjson = None
+
+import numpy as np
 import pandas as pd
 import requests
 import tushare as ts
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 TS_TOKEN_ENV = "TUSHARE_TOKEN"
 _PRO = None  # 全局缓存 TuShare pro()
-_NAME_CACHE: Dict[str, str] = {}  # ts_code -> name
+_PRO_LOCK = threading.Lock()   # 多线程生成时保护 _PRO 初始化
+
+CACHE_DIR = Path(os.environ.get("SRSS_CACHE_DIR", Path.home() / ".cache" / "stockrss"))
+NAME_TTL = 86400      # 证券简称：一天
+OVERVIEW_TTL = 300    # 北向资金：5 分钟
+
+# 东财 push2：复用连接（keep-alive），避免每次请求重新 TCP+TLS 握手
+EM_HEADERS = {"Referer": "https://quote.eastmoney.com/", "User-Agent": "Mozilla/5.0"}
+EM_CHUNK = 50    # 每次 ulist.np 请求的 secid 数
+EM_WORKERS = 4   # 分组并发请求数
+TS_MINS_WORKERS = 4  # stk_mins 逐只请求的并发数（接口按单个 ts_code 调用）
+_SESSION = requests.Session()
+_SESSION.headers.update(EM_HEADERS)
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3)),
+)
 
 
 # ============== 通用工具 ==============
 
+class _TTLCache:
+    """极简线程安全 TTL 缓存：key -> (过期时间戳, value)。过期时间用墙钟，便于落盘后跨进程复用。"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: Dict[str, Tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._data.get(key)
+        if hit is None or hit[0] < time.time():
+            return None
+        return hit[1]
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+
+    def setdefault(self, key: str, value):
+        """key 未命中（或已过期）才写入；返回最终缓存的值，并发写入时各线程拿到同一个结果。"""
+        now = time.time()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] >= now:
+                return hit[1]
+            self._data[key] = (now + self.ttl, value)
+            return value
+
+    def dump(self) -> Dict[str, Tuple[float, object]]:
+        """未过期条目的快照（用于落盘）。"""
+        now = time.time()
+        with self._lock:
+            return {k: v for k, v in self._data.items() if v[0] >= now}
+
+    def load(self, data: Dict[str, Tuple[float, object]]) -> None:
+        now = time.time()
+        with self._lock:
+            for k, (exp, v) in data.items():
+                if exp >= now:
+                    self._data[k] = (exp, v)
+
+
+_NAME_CACHE = _TTLCache(NAME_TTL)          # ts_code -> name
+_NAME_FILE = CACHE_DIR / "names.json"
+_NAME_DIRTY = False
+_OVERVIEW_CACHE = _TTLCache(OVERVIEW_TTL)
+
+
+def _load_name_cache() -> None:
+    try:
+        _NAME_CACHE.load(json.loads(_NAME_FILE.read_text(encoding="utf-8")))
+    except Exception:
+        pass
+
+
+def _flush_name_cache() -> None:
+    """进程退出时把简称缓存合并写回 names.json（文件锁保护多进程并发）。"""
+    if not _NAME_DIRTY:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(CACHE_DIR / "names.lock", "w") as lf:
+            if fcntl is not None:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                merged = json.loads(_NAME_FILE.read_text(encoding="utf-8"))
+            except Exception:
+                merged = {}
+            merged.update(_NAME_CACHE.dump())
+            tmp = _NAME_FILE.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(merged, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, _NAME_FILE)
+    except Exception as e:
+        if os.environ.get("SRSS_DEBUG") == "1":
+            print("[DEBUG] flush name cache error:", repr(e))
+
+
+_load_name_cache()
+atexit.register(_flush_name_cache)
+
+
 def _now_cn_str() -> str:
     return pd.Timestamp.now(tz="Asia/Shanghai").strftime("%Y-%m-%d %H:%M:%S")
 
@@ -31,11 +149,18 @@ def _today_ymd() -> str:
     return pd.Timestamp.now(tz="Asia/Shanghai").strftime("%Y%m%d")
 
 
+_NUM_STRIP = str.maketrans("", "", ",%")  # 千分位逗号、百分号一次删掉
+
+
 def _to_float(x) -> Optional[float]:
     if x is None:
         return None
+    # DataFrame 里取出的多是 numpy 标量：直接转换，跳过字符串清洗
+    if isinstance(x, (int, float, np.integer, np.floating)):
+        f = float(x)
+        return None if math.isnan(f) else f
     try:
-        s = str(x).replace(",", "").replace("%", "").strip()
+        s = str(x).translate(_NUM_STRIP).strip()
         if s in ("", "—") or s.lower() == "nan":
             return None
         return float(s)
@@ -43,16 +168,24 @@ def _to_float(x) -> Optional[float]:
         return None
 
 
+def _pick_col(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+    """返回 candidates 中第一个存在于 df 的列名；列名只建一次 set，O(1) 判断。"""
+    colset = set(df.columns)
+    return next((c for c in candidates if c in colset), None)
+
+
 def normalize_code(code: str) -> str:
     """
     统一股票代码为带交易所前缀（sh/sz）。
     - 已带前缀：直接返回
     - 纯6位数字：6/9/5 -> 上交所(sh)，0/1/2/3 -> 深交所(sz)
+    只做长度 + 字符集判断，不走正则引擎（每个用户的每只股票都会调用）。
     """
     code = str(code).strip().lower()
-    if re.match(r"^(sh|sz)\d{6}$", code):
+    n = len(code)
+    if n == 8 and code[:2] in ("sh", "sz") and code[2:].isascii() and code[2:].isdigit():
         return code
-    if re.match(r"^\d{6}$", code):
+    if n == 6 and code.isascii() and code.isdigit():
         return ("sh" if code[0] in "695" else "sz") + code
     raise ValueError(f"非法股票代码：{code}")
 
@@ -64,30 +197,35 @@ def _to_ts_code(code_full: str) -> str:
 
 
 def _get_pro():
-    """获取并缓存 TuShare pro()；需要环境变量 TUSHARE_TOKEN。"""
+    """获取并缓存 TuShare pro()；需要环境变量 TUSHARE_TOKEN。双重检查：已初始化时不抢锁。"""
     global _PRO
     if _PRO is not None:
         return _PRO
-    token = os.environ.get(TS_TOKEN_ENV, "").strip()
-    if not token:
-        raise RuntimeError(
-            f"未找到环境变量 {TS_TOKEN_ENV}，请先安全配置 TuShare Token（见文末说明）"
-        )
-    ts.set_token(token)
-    _PRO = ts.pro_api()
-    return _PRO
+    with _PRO_LOCK:
+        if _PRO is not None:
+            return _PRO
+        token = os.environ.get(TS_TOKEN_ENV, "").strip()
+        if not token:
+            raise RuntimeError(
+                f"未找到环境变量 {TS_TOKEN_ENV}，请先安全配置 TuShare Token（见文末说明）"
+            )
+        ts.set_token(token)
+        _PRO = ts.pro_api()
+        return _PRO
 
 
 def _get_name(ts_code: str) -> str:
-    """缓存获取证券简称；失败返回空串，不影响主流程。"""
-    if ts_code in _NAME_CACHE:
-        return _NAME_CACHE[ts_code]
+    """缓存获取证券简称（TTL 一天，落盘到 names.json）；失败返回空串，不影响主流程。"""
+    global _NAME_DIRTY
+    name = _NAME_CACHE.get(ts_code)
+    if name is not None:
+        return name
     try:
         pro = _get_pro()
         df = pro.stock_basic(ts_code=ts_code, fields="ts_code,name")
         if df is not None and not df.empty:
-            name = str(df.iloc[0]["name"])
-            _NAME_CACHE[ts_code] = name
+            name = _NAME_CACHE.setdefault(ts_code, str(df.iloc[0]["name"]))
+            _NAME_DIRTY = True
             return name
     except Exception:
         pass
@@ -101,7 +239,12 @@ def get_northbound_overview() -> Dict[str, Optional[float]]:
     使用 TuShare moneyflow_hsgt 获取北向当日（若无则最近一次）净流入（单位：亿元）
     返回: {"sh":float|None, "sz":float|None, "total":float|None, "time": "..."}
     列名兼容：sh_net/hgt（沪股通），sz_net/sgt（深股通），hsgt_net/north_money（北向）
+    成功结果进程内缓存 OVERVIEW_TTL 秒。
     """
+    hit = _OVERVIEW_CACHE.get("overview")
+    if hit is not None:
+        return dict(hit)
+
     ts_now = _now_cn_str()
     today = _today_ymd()
 
@@ -120,12 +263,12 @@ def get_northbound_overview() -> Dict[str, Optional[float]]:
                 end_date=today,
             )
         if df is not None and not df.empty:
-            df = df.sort_values("trade_date")
-            row = df.iloc[-1]
+            # 最近一个交易日，O(N) 不排序；只用这一行，转成普通 dict 取字段
+            row = df.loc[df["trade_date"].astype(int).idxmax()].to_dict()
 
-            def pick(row, cols: List[str]):
+            def pick(row: dict, cols: List[str]):
                 for c in cols:
-                    if c in row.index:
+                    if c in row:
                         v = _to_float(row[c])
                         if v is not None:
                             return v
@@ -140,12 +283,15 @@ def get_northbound_overview() -> Dict[str, Optional[float]]:
         if os.environ.get("SRSS_DEBUG") == "1":
             print("[DEBUG] get_northbound_overview tushare error:", repr(e))
 
-    return {"sh": r2(sh), "sz": r2(sz), "total": r2(total), "time": ts_now}
+    res = {"sh": r2(sh), "sz": r2(sz), "total": r2(total), "time": ts_now}
+    if total is not None:
+        _OVERVIEW_CACHE.set("overview", res)
+    return dict(res)
 
 
 # ============== A股快照（TuShare：价格/涨跌幅/成交额-万元） ==============
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Quote:
     code: str         # 规范化代码，如 sh600519
     name: str
@@ -155,24 +301,22 @@ class Quote:
     time: str
 
 
-def _calc_amount_wan_from_minbar(close: Optional[float], vol_hand: Optional[float]) -> Optional[float]:
+def _calc_amount_wan_from_minbar(close: pd.Series, vol_hand: pd.Series) -> pd.Series:
     """
-    用分时 K 的 close 和 vol(手)估算成交额（万元）：
+    用分时 K 的 close 和 vol(手)估算成交额（万元），按列向量化计算，缺失值为 NaN：
       金额(元) = close * (vol_hand * 100)
       金额(万元) = 上式 / 1e4 = close * vol_hand / 100
     """
-    if close is None or vol_hand is None:
-        return None
-    try:
-        return float(close) * float(vol_hand) / 100.0
-    except Exception:
-        return None
+    return close * vol_hand / 100.0
+
+
+_NO_BAR = (None, None, None)
 
 
 def get_realtime_quotes(codes: List[str]) -> Dict[str, Quote]:
     """
-    使用 TuShare pro_bar(freq='1min') 获取最新 1 分钟 close 作为最新价；
-    pct 若接口未给，则用 前收/最新价 计算；
+    使用 TuShare stk_mins(freq='1min') 获取最新 1 分钟 close 作为最新价（每只一次请求，线程池并发）；
+    pct 若接口未给，则用 前收/最新价 计算（daily 同样一次批量拉取）；
     成交额（万元）用公式 close*vol/100（vol 为“手”）。
     """
     res: Dict[str, Quote] = {}
@@ -180,60 +324,89 @@ def get_realtime_quotes(codes: List[str]) -> Dict[str, Quote]:
     if not codes:
         return res
 
+    norm = [normalize_code(c) for c in codes]
+
     try:
         pro = _get_pro()
     except Exception as e:
         if os.environ.get("SRSS_DEBUG") == "1":
             print("[DEBUG] get_realtime_quotes pro error:", repr(e))
-        for c in codes:
-            c2 = normalize_code(c)
+        for c2 in norm:
             res[c2] = Quote(c2, "", None, None, None, ts_now)
         return res
 
-    start_for_min = (pd.Timestamp.now(tz="Asia/Shanghai") - pd.Timedelta(days=3)).strftime("%Y%m%d")
+    ts_map = {_to_ts_code(c2): c2 for c2 in norm}  # ts_code -> sh600519
+    ts_codes = list(ts_map)
+    now = pd.Timestamp.now(tz="Asia/Shanghai")
 
-    for code in codes:
-        c2 = normalize_code(code)
-        ts_code = _to_ts_code(c2)
-        price = pct = None
-        amt_wan = None
-        name = _get_name(ts_code)
+    # 最新 1 分钟（最近3天内，保证有数据）
+    bars: Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]] = {}  # ts_code -> (close, 成交额万, pct_chg)
+    start_for_min = (now - pd.Timedelta(days=3)).strftime("%Y-%m-%d 09:00:00")
 
+    def fetch_mins(ts_code: str) -> Optional[pd.DataFrame]:
+        # stk_mins 文档只支持单个 ts_code；单只 3 天约 720 行，远低于单次 8000 行上限
         try:
-            # 最新 1 分钟（最近3天内，保证有数据）
-            dfm = ts.pro_bar(ts_code=ts_code, freq="1min", asset="E", start_date=start_for_min)
-            if dfm is not None and not dfm.empty:
-                key_time = "trade_time" if "trade_time" in dfm.columns else ("datetime" if "datetime" in dfm.columns else "trade_date")
-                dfm = dfm.sort_values(key_time)
-                last = dfm.iloc[-1]
-                price = _to_float(last.get("close"))
-                # 成交额（万）
-                amt_wan = _calc_amount_wan_from_minbar(price, _to_float(last.get("vol")))  # vol(手)
-                # 优先用接口 pct_chg
-                pct = _to_float(last.get("pct_chg"))
-
-            # 计算 pct（若上面没有）
-            if pct is None:
-                dfd = pro.daily(
-                    ts_code=ts_code,
-                    start_date=(pd.Timestamp.now(tz="Asia/Shanghai") - pd.Timedelta(days=10)).strftime("%Y%m%d"),
-                    end_date=_today_ymd(),
-                )
-                if dfd is not None and not dfd.empty:
-                    dfd = dfd.sort_values("trade_date")
-                    prev_close = _to_float(
-                        dfd.iloc[-1]["pre_close"] if "pre_close" in dfd.columns
-                        else (dfd.iloc[-2]["close"] if len(dfd) >= 2 else None)
-                    )
-                    if price is not None and prev_close and prev_close != 0:
-                        pct = (price / prev_close - 1.0) * 100.0
+            df = pro.stk_mins(ts_code=ts_code, freq="1min", start_date=start_for_min)
+        except Exception as e:
+            if os.environ.get("SRSS_DEBUG") == "1":
+                print(f"[DEBUG] quote stk_mins error {ts_code}:", repr(e))
+            return None
+        if df is None or df.empty:
+            return None
+        return df.assign(ts_code=ts_code)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(TS_MINS_WORKERS, len(ts_codes))) as ex:
+            frames = [f for f in ex.map(fetch_mins, ts_codes) if f is not None]
+        if frames:
+            dfm = pd.concat(frames, ignore_index=True)  # 索引必须唯一，idxmax 才能取回对应行
+            key_time = _pick_col(dfm, ["trade_time", "datetime"]) or "trade_date"
+            # 每只股票最新一根：groupby + idxmax，避免对整张分时表排序
+            last = dfm.loc[pd.to_datetime(dfm[key_time]).groupby(dfm["ts_code"]).idxmax()].copy()
+            # 先取每只股票最后一行，再只对这 N 行做向量化类型转换
+            for col in ("close", "vol", "pct_chg"):
+                if col in last.columns:
+                    last[col] = pd.to_numeric(last[col], errors="coerce")
+            if "close" in last.columns and "vol" in last.columns:
+                last["amount_wan"] = _calc_amount_wan_from_minbar(last["close"], last["vol"])  # vol(手)
+            # 缺的列补 NaN；选定列后一次 to_numpy，按行 zip 成元组
+            arr = last.reindex(columns=["ts_code", "close", "amount_wan", "pct_chg"]).to_numpy()
+            bars = {t: (_to_float(p), _to_float(a), _to_float(pc)) for t, p, a, pc in arr}
+    except Exception as e:
+        if os.environ.get("SRSS_DEBUG") == "1":
+            print("[DEBUG] quote stk_mins error:", repr(e))
 
+    # 接口未给 pct_chg 的，批量取 daily 补前收
+    prev_close: Dict[str, Optional[float]] = {}
+    need_daily = [t for t in ts_codes if bars.get(t, _NO_BAR)[2] is None]
+    if need_daily:
+        try:
+            dfd = pro.daily(
+                ts_code=",".join(need_daily),
+                start_date=(now - pd.Timedelta(days=10)).strftime("%Y%m%d"),
+                end_date=_today_ymd(),
+            )
+            if dfd is not None and not dfd.empty:
+                dfd = dfd.sort_values("trade_date")
+                has_pre_close = "pre_close" in dfd.columns
+                for t, g in dfd.groupby("ts_code"):
+                    prev_close[t] = _to_float(
+                        g.iloc[-1]["pre_close"] if has_pre_close
+                        else (g.iloc[-2]["close"] if len(g) >= 2 else None)
+                    )
         except Exception as e:
             if os.environ.get("SRSS_DEBUG") == "1":
-                print(f"[DEBUG] quote error {ts_code}:", repr(e))
+                print("[DEBUG] quote daily error:", repr(e))
+
+    for ts_code, c2 in ts_map.items():
+        price, amt_wan, pct = bars.get(ts_code, _NO_BAR)  # 优先用接口 pct_chg
+        if pct is None:
+            pc = prev_close.get(ts_code)
+            if price is not None and pc:
+                pct = (price / pc - 1.0) * 100.0
 
         res[c2] = Quote(
-            code=c2, name=name, price=price, pct=(None if pct is None else round(pct, 2)),
+            code=c2, name=_get_name(ts_code), price=price, pct=(None if pct is None else round(pct, 2)),
             amount_wan=(None if amt_wan is None else float(f"{amt_wan:.2f}")), time=ts_now
         )
 
@@ -242,7 +415,7 @@ def get_realtime_quotes(codes: List[str]) -> Dict[str, Quote]:
 
 # ============== 个股资金流（东财 push2，万元·整数，正=流入） ==============
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FundFlow:
     code: str
     main_wan: Optional[int]     # 主力净额（万元·整数；正=流入，负=流出）
@@ -256,9 +429,9 @@ class FundFlow:
 def _secid(code_full: str) -> str:
     """
     东方财富 secid：深 0.XXXXXX，沪 1.XXXXXX
+    入参须是已规范化的代码（sh600519），调用方已 normalize 过，这里不再重复。
     """
-    c = normalize_code(code_full)
-    return ("1." if c.startswith("sh") else "0.") + c[-6:]
+    return ("1." if code_full.startswith("sh") else "0.") + code_full[-6:]
 
 
 def _yuan_to_wan_int(v: Optional[float]) -> Optional[int]:
@@ -270,43 +443,36 @@ def _yuan_to_wan_int(v: Optional[float]) -> Optional[int]:
         return None
 
 
-def get_fund_flow_batch(codes: List[str]) -> Dict[str, FundFlow]:
-    """
-    东方财富 push2：ulist.np，一次拉多只
-      f62 主力净额(元)   f66 超大单(元)   f69 大单(元)   f72 中单(元)   f75 小单(元)
-    统一换算为“万元·整数”；正=流入，负=流出（不做符号翻转）
-    """
-    res: Dict[str, FundFlow] = {}
-    if not codes:
-        return res
+# f12 代码 + 五档净额，一次 C 层多键取值
+_EM_FLOW_FIELDS = itemgetter("f12", "f62", "f66", "f69", "f72", "f75")
 
-    norm = [normalize_code(c) for c in codes]
+
+def _fetch_fund_flow_chunk(norm: List[str], ts_now: str) -> Dict[str, FundFlow]:
+    """单次 ulist.np 请求（一组已规范化代码）；失败返回空 dict，由调用方补齐。"""
+    res: Dict[str, FundFlow] = {}
     code_map = {c[-6:]: c for c in norm}
     url = "https://push2.eastmoney.com/api/qt/ulist.np/get"
     params = {
         "fltt": "2",
         "invt": "2",
-        "secids": ",".join([_secid(c) for c in norm]),
+        "secids": ",".join(_secid(c) for c in norm),
         "fields": "f12,f14,f62,f66,f69,f72,f75",
     }
-    headers = {"Referer": "https://quote.eastmoney.com/", "User-Agent": "Mozilla/5.0"}
-    ts_now = _now_cn_str()
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=8)
+        r = _SESSION.get(url, params=params, timeout=8)
         r.raise_for_status()
-        j = r.json()
+        j = orjson.loads(r.content) if orjson is not None else r.json()
         diff = (j.get("data") or {}).get("diff") or []
         for it in diff:
-            num = str(it.get("f12") or "").zfill(6)
-            full = code_map.get(num)
+            try:
+                num, *vals = _EM_FLOW_FIELDS(it)
+            except KeyError:  # 个别条目缺字段：按没返回处理
+                continue
+            full = code_map.get(str(num or "").zfill(6))
             if not full:
                 continue
-            main  = _yuan_to_wan_int(_to_float(it.get("f62")))
-            huge  = _yuan_to_wan_int(_to_float(it.get("f66")))
-            large = _yuan_to_wan_int(_to_float(it.get("f69")))
-            medium= _yuan_to_wan_int(_to_float(it.get("f72")))
-            small = _yuan_to_wan_int(_to_float(it.get("f75")))
+            main, huge, large, medium, small = [_yuan_to_wan_int(_to_float(v)) for v in vals]
             res[full] = FundFlow(
                 code=full, main_wan=main, huge_wan=huge, large_wan=large,
                 medium_wan=medium, small_wan=small, time=ts_now
@@ -314,6 +480,29 @@ def get_fund_flow_batch(codes: List[str]) -> Dict[str, FundFlow]:
     except Exception as e:
         if os.environ.get("SRSS_DEBUG") == "1":
             print("[DEBUG] get_fund_flow_batch error:", repr(e))
+    return res
+
+
+def get_fund_flow_batch(codes: List[str]) -> Dict[str, FundFlow]:
+    """
+    东方财富 push2：ulist.np，一次拉多只
+      f62 主力净额(元)   f66 超大单(元)   f69 大单(元)   f72 中单(元)   f75 小单(元)
+    统一换算为“万元·整数”；正=流入，负=流出（不做符号翻转）
+    代码多时每 EM_CHUNK 只拆成一组，复用同一个 Session 并发请求，避免 URL 过长/响应截断。
+    """
+    res: Dict[str, FundFlow] = {}
+    if not codes:
+        return res
+
+    norm = [normalize_code(c) for c in codes]
+    ts_now = _now_cn_str()
+    chunks = [norm[i:i + EM_CHUNK] for i in range(0, len(norm), EM_CHUNK)]
+    if len(chunks) == 1:
+        res.update(_fetch_fund_flow_chunk(chunks[0], ts_now))
+    else:
+        with ThreadPoolExecutor(max_workers=min(EM_WORKERS, len(chunks))) as ex:
+            for part in ex.map(lambda g: _fetch_fund_flow_chunk(g, ts_now), chunks):
+                res.update(part)
 
     # 补齐没返回的
     for c in norm:
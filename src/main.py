@@ -1,18 +1,36 @@
 import os, time, yaml, re
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from data_providers import get_realtime_quotes, get_individual_moneyflow, get_northbound_overview
+from typing import Dict
+from data_providers import FundFlow, Quote, normalize_code, get_realtime_quotes, get_fund_flow_batch, get_northbound_overview
 from rss_builder import build_feed
-from utils import fmt_yn, fmt_pct
+from utils import fmt_yn, fmt_pct_vec
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 
 TOKEN_RE = re.compile(r"^[A-Za-z0-9]{6,32}$")
 USER_RE  = re.compile(r"^[a-zA-Z0-9_-]{1,32}$")
+MAX_WORKERS = max(1, int(os.environ.get("SRSS_WORKERS", "8")))  # 同时生成的用户数上限
 
-def compose_items(quotes_df: pd.DataFrame):
+def quotes_frame(quotes: Dict[str, Quote]) -> pd.DataFrame:
+    """把 get_realtime_quotes 的结果转成 compose_items 用的表（成交额换算为亿元）；无价格的行丢弃。"""
+    rows = [
+        {"code": q.code, "name": q.name or q.code.upper(), "price": q.price, "pct_chg": q.pct,
+         "amount": None if q.amount_wan is None else round(q.amount_wan / 1e4, 2), "time": q.time}
+        for q in quotes.values() if q.price is not None
+    ]
+    return pd.DataFrame(rows, columns=["code", "name", "price", "pct_chg", "amount", "time"])
+
+def _str_col(s: pd.Series) -> pd.Series:
+    """数值列转展示字符串；缺失值（None/NaN）统一为“—”，不让 NaN 混进拼接结果。"""
+    return s.astype(object).map(lambda v: "—" if pd.isna(v) else str(v))
+
+def compose_items(quotes_df: pd.DataFrame, north: dict, flows: Dict[str, FundFlow]):
     items = []
-    north = get_northbound_overview()
+    # 同一次生成的条目共用一个时间戳：guid 在本次构建内确定，也省掉逐条取时间
+    now_ts = int(time.time())
+    now_utc = datetime.now(timezone.utc)
     northline = f"北向资金（亿元） | 沪股通 {north['sh']} | 深股通 {north['sz']} | 合计 {north['total']} | 时间 {north['time']}"
 
     # 如果没有拿到任何个股快照，写一个心跳条目，避免整份 RSS 缺失
@@ -21,38 +39,56 @@ def compose_items(quotes_df: pd.DataFrame):
             "title": f"北向资金心跳 {north.get('total','—')} 亿元",
             "link": "https://stockrss.cuixiaoyuan.cn/",
             "description": f"<p>个股快照暂不可用，稍后自动重试。</p><p>{northline}</p>",
-            "guid": f"heartbeat-{int(time.time())}",
-            "pubdate": datetime.now(timezone.utc),
+            "guid": f"heartbeat-{now_ts}",
+            "pubdate": now_utc,
         })
         return items
 
-    for _, row in quotes_df.iterrows():
-        code = row["code"]
-        q_name = row["name"]
-        q_price = row["price"]
-        q_pct = row["pct_chg"]
-        q_amount = row["amount"]
-        mf = get_individual_moneyflow(code)
-        html = f"""
-        <p><b>{q_name}（{code}）</b></p>
-        <p>最新价：{q_price}　涨跌幅：{fmt_pct(q_pct)}　成交额：{q_amount} 亿元　时间：{row['time']}</p>
-        <p><b>当日净流入（万元）</b><br/>
-        主力：{fmt_yn(mf['main'])}　超大单：{fmt_yn(mf['super'])}　大单：{fmt_yn(mf['large'])}　
-        中单：{fmt_yn(mf['medium'])}　小单：{fmt_yn(mf['small'])}</p>
-        <p>数据时间（资金流）：{mf['ts']}</p>
-        <hr/>
-        <p>{northline}</p>
-        """
+    # 按列拼接标题/链接/正文，避免 iterrows 逐行装箱
+    df = quotes_df.reset_index(drop=True)
+    fl = [flows[c] for c in df["code"]]
+    for col in ("main_wan", "huge_wan", "large_wan", "medium_wan", "small_wan"):
+        # object 列保留 None，fmt_yn 才能输出“—”
+        df[col] = pd.Series([getattr(f, col) for f in fl], dtype=object).map(fmt_yn)
+    df["flow_time"] = [f.time for f in fl]
+    pct_str = fmt_pct_vec(df["pct_chg"])  # 标题和正文共用
+    price_str = _str_col(df["price"])
+
+    titles = df["name"] + " " + pct_str + " | 最新 " + price_str
+    links = "https://xueqiu.com/S/" + df["code"].str.upper()
+    descs = (
+        "\n        <p><b>" + df["name"] + "（" + df["code"] + "）</b></p>"
+        + "\n        <p>最新价：" + price_str + "　涨跌幅：" + pct_str
+        + "　成交额：" + _str_col(df["amount"]) + " 亿元　时间：" + df["time"] + "</p>"
+        + "\n        <p><b>当日净流入（万元）</b><br/>"
+        + "\n        主力：" + df["main_wan"] + "　超大单：" + df["huge_wan"] + "　大单：" + df["large_wan"] + "　"
+        + "\n        中单：" + df["medium_wan"] + "　小单：" + df["small_wan"] + "</p>"
+        + "\n        <p>数据时间（资金流）：" + df["flow_time"] + "</p>"
+        + "\n        <hr/>"
+        + f"\n        <p>{northline}</p>\n        "
+    )
+
+    for code, title, link, html in zip(df["code"], titles, links, descs):
         items.append({
-            "title": f"{q_name} {fmt_pct(q_pct)} | 最新 {q_price}",
-            "link": "https://xueqiu.com/S/" + code.replace("sh","SH").replace("sz","SZ"),
+            "title": title,
+            "link": link,
             "description": html,
-            "guid": f"{code}-{int(time.time())}",
-            "pubdate": datetime.now(timezone.utc),
+            "guid": f"{code}-{now_ts}",
+            "pubdate": now_utc,
         })
     return items
 
-def run_for_user(user_cfg: dict, defaults: dict):
+def fetch_market(codes: list):
+    """北向/行情/资金流互不依赖，并发抓取；资金流一次批量拉取（东财 ulist.np）。返回 (north, quotes, flows)。"""
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        f_north = ex.submit(get_northbound_overview)
+        f_quotes = ex.submit(get_realtime_quotes, codes)
+        f_flows = ex.submit(get_fund_flow_batch, codes)
+        return f_north.result(), f_quotes.result(), f_flows.result()
+
+def run_for_user(user_cfg: dict, defaults: dict, quotes: Dict[str, Quote] = None,
+                 flows: Dict[str, FundFlow] = None, north: dict = None):
+    """quotes/flows/north 由 run_all 对所有用户统一抓取后传入；单独调用时自己抓。"""
     # —— 强制校验 user_id & token ——
     user_id = str(user_cfg.get("user_id","")).strip()
     token   = str(user_cfg.get("token","")).strip()
@@ -62,22 +98,55 @@ def run_for_user(user_cfg: dict, defaults: dict):
         raise ValueError(f"{user_id} 缺少合法 token（必须包含 6-32 位字母或数字）")
 
     stocks = user_cfg["stocks"]
-    # 行情抓取失败时，get_realtime_quotes 会返回空表
-    quotes = get_realtime_quotes(stocks)
+    if quotes is None or flows is None or north is None:
+        north, quotes, flows = fetch_market(stocks)
+    else:
+        # 共享结果里只挑出本用户的股票
+        norm = [normalize_code(c) for c in stocks]
+        quotes = {c: quotes[c] for c in norm if c in quotes}
+        flows = {c: flows[c] for c in norm if c in flows}
+    # 行情抓取失败时，quotes_frame 会得到空表
+    quotes_df = quotes_frame(quotes)
 
     meta = {
         "title": user_cfg.get("title", defaults["feed"]["title"]),
         "link": defaults["feed"]["link"],
         "description": defaults["feed"]["description"]
     }
-    items = compose_items(quotes)
+    items = compose_items(quotes_df, north, flows)
     xml = build_feed(meta, items)
 
     file_name = f"{user_id}-{token}.xml"
     out_dir = defaults.get("output_dir", os.path.join(ROOT, "public", "feeds"))
     os.makedirs(out_dir, exist_ok=True)
     out = os.path.join(out_dir, file_name)
-    with open(out, "w", encoding="utf-8") as f:
+    with open(out, "wb") as f:
         f.write(xml)
     print(f"[OK] {user_id} → {out}")
     return file_name
+
+def _union_codes(users: list) -> list:
+    codes = set()
+    for u in users:
+        for c in u.get("stocks") or []:
+            try:
+                codes.add(normalize_code(c))
+            except ValueError:
+                pass  # 非法代码留给该用户的 run_for_user 报错，不影响其他用户
+    return sorted(codes)
+
+def run_all(users: list, defaults: dict) -> list:
+    """
+    多用户生成：先对所有用户自选股的并集统一抓一次行情/资金流/北向，
+    再用线程池（最多 MAX_WORKERS 个）并发生成各自的 RSS；单个用户失败不影响其他用户。
+    """
+    north, quotes, flows = fetch_market(_union_codes(users))
+    generated = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {ex.submit(run_for_user, u, defaults, quotes, flows, north): u for u in users}
+        for fut in as_completed(futures):
+            try:
+                generated.append(fut.result())
+            except Exception as e:
+                print(f"[ERR] {futures[fut].get('user_id', '?')} -> {e}")
+    return generated
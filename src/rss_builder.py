@@ -1,17 +1,47 @@
-from feedgen.feed import FeedGenerator
 from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
 
-def build_feed(meta: dict, items: list) -> str:
-    fg = FeedGenerator()
-    fg.title(meta["title"])
-    fg.link(href=meta.get("link", ""), rel='alternate')
-    fg.description(meta.get("description", ""))
-    fg.language('zh-cn')
-    for it in items:
-        fe = fg.add_entry()
-        fe.title(it["title"])
-        fe.link(href=it.get("link", meta.get("link","")))
-        fe.guid(it["guid"], permalink=False)
-        fe.pubDate(it["pubdate"])
-        fe.description(it["description"])
-    return fg.rss_str(pretty=True).decode("utf-8")
+# 直接用模板拼 RSS 2.0，省掉 feedgen 的整树构建 + pretty-print；main.py / build_all.py 共用
+_RSS_HEAD = (
+    "<?xml version='1.0' encoding='UTF-8'?>\n"
+    '<rss version="2.0"><channel>'
+    "<title>{title}</title><link>{link}</link><description>{description}</description>"
+    "<language>{language}</language><lastBuildDate>{build_date}</lastBuildDate>{ttl}\n"
+)
+_ITEM_TMPL = (
+    "<item><title>{title}</title>{link}<description>{desc}</description>"
+    '<guid isPermaLink="false">{guid}</guid><pubDate>{pubdate}</pubDate></item>\n'
+)
+_RSS_TAIL = "</channel></rss>\n"
+
+def build_feed(meta: dict, items: list) -> bytes:
+    """返回 UTF-8 编码后的 XML，调用方直接以二进制写文件。
+
+    meta 可选 language（默认 zh-cn）、build_date（datetime，默认当前时间）、ttl（分钟）；
+    item 的 link 可省略，省略时不输出 <link>。
+    """
+    ttl = meta.get("ttl")
+    head = _RSS_HEAD.format(
+        title=escape(meta["title"]),
+        link=escape(meta.get("link", "")),
+        description=escape(meta.get("description", "")),
+        language=escape(meta.get("language", "zh-cn")),
+        build_date=format_datetime(meta.get("build_date") or datetime.now(timezone.utc)),
+        ttl=f"<ttl>{int(ttl)}</ttl>" if ttl is not None else "",
+    )
+    dates: dict = {}  # 同一次构建的条目通常共用一个时间，格式化一次即可
+    items_xml = []
+    for it in reversed(items):  # 与 feedgen 默认的 prepend 顺序一致
+        pub = it["pubdate"]
+        if pub not in dates:
+            dates[pub] = format_datetime(pub)
+        link = it.get("link")
+        items_xml.append(_ITEM_TMPL.format(
+            title=escape(it["title"]),
+            link=f"<link>{escape(link)}</link>" if link else "",
+            desc=escape(it["description"]),
+            guid=escape(it["guid"]),
+            pubdate=dates[pub],
+        ))
+    return "".join([head, *items_xml, _RSS_TAIL]).encode("utf-8")
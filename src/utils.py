@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 def fmt_yn(v):
     return "—" if v is None else f"{v:,.0f}"
 
@@ -5,3 +8,9 @@ def fmt_pct(v):
     if v is None: return "—"
     sign = "↑" if v >= 0 else "↓"
     return f"{sign}{abs(v):.2f}%"
+
+def fmt_pct_vec(pct: pd.Series) -> pd.Series:
+    """fmt_pct 的整列版本：numpy 一次性格式化，缺失（None/NaN）为“—”。"""
+    arr = pd.to_numeric(pct, errors="coerce").to_numpy(dtype=float)
+    body = np.char.add(np.where(arr >= 0, "↑", "↓"), np.char.mod("%.2f%%", np.abs(arr)))
+    return pd.Series(np.where(np.isnan(arr), "—", body), index=pct.index, dtype=object)